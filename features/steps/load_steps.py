@@ -36,12 +36,16 @@ def step_impl(context):
     # List all of the products and delete them one by one
     #
     rest_endpoint = f"{context.base_url}/products"
-    context.resp = requests.get(rest_endpoint)
-    assert context.resp.status_code == HTTP_200_OK
-
-    for product in context.resp.json():
-        context.resp = requests.delete(f"{rest_endpoint}/{product['id']}")
-        assert context.resp.status_code == HTTP_204_NO_CONTENT
+    while True:
+        context.resp = requests.get(rest_endpoint)
+        assert context.resp.status_code == HTTP_200_OK
+        products = context.resp.json()["items"]
+        if not products:
+            break
+
+        for product in products:
+            context.resp = requests.delete(f"{rest_endpoint}/{product['id']}")
+            assert context.resp.status_code == HTTP_204_NO_CONTENT
 
     #
     # load the database with new products
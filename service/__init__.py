@@ -11,13 +11,14 @@ and SQL database
 import sys
 from flask import Flask
 from service import config
-from service.common import log_handlers
+from service.common import log_handlers, json_provider
 
 # NOTE: Do not change the order of this code
 # The Flask app must be created BEFORE you import modules that depend on it !!!
 
 # Create the Flask app
 app = Flask(__name__)  # pylint: disable=invalid-name
+app.json = json_provider.OrjsonProvider(app)
 
 # Load Configurations
 app.config.from_object(config)
@@ -1,8 +1,11 @@
 """
 Flask CLI Command Extensions
 """
+import click
+from sqlalchemy import SmallInteger
+from sqlalchemy.schema import CreateIndex
 from service import app
-from service.models import db
+from service.models import db, Category, Product
 
 
 ######################################################################
@@ -18,3 +21,62 @@ def db_create():
     db.drop_all()
     db.create_all()
     db.session.commit()
+
+
+######################################################################
+# Command to add missing indexes to an existing database
+# Usage: flask db-create-indexes
+######################################################################
+@app.cli.command("db-create-indexes")
+def db_create_indexes():
+    """
+    Adds the Product indexes missing from an existing database; create_all()
+    only builds indexes together with new tables. Each build blocks writes
+    to the table while it runs, so use a quiet window on large tables.
+    """
+    if db.engine.dialect.name == "postgresql":
+        # Index builds on large tables outlast the pool's statement_timeout
+        db.session.execute(db.text("SET LOCAL statement_timeout = 0"))
+    for index in Product.__table__.indexes:
+        db.session.execute(CreateIndex(index, if_not_exists=True))
+        click.echo(f"Index {index.name} is in place")
+    db.session.commit()
+
+
+######################################################################
+# Command to convert the category column to SMALLINT
+# Usage: flask db-migrate-category
+######################################################################
+@app.cli.command("db-migrate-category")
+def db_migrate_category():
+    """
+    Converts product.category from the old PostgreSQL ENUM type to the
+    SMALLINT Category value. Run once on databases created before the
+    change; new databases are created with SMALLINT already.
+    """
+    columns = db.inspect(db.engine).get_columns("product")
+    column_type = next(column["type"] for column in columns if column["name"] == "category")
+    if isinstance(column_type, SmallInteger):
+        click.echo("product.category is already SMALLINT, nothing to do")
+        return
+
+    cases = " ".join(f"WHEN '{category.name}' THEN {category.value}" for category in Category)
+    steps = (
+        # The type change rewrites the whole table, lift the pool's statement_timeout
+        ("Lifted statement_timeout", "SET LOCAL statement_timeout = 0"),
+        ("Dropped the ENUM default", "ALTER TABLE product ALTER COLUMN category DROP DEFAULT"),
+        (
+            "Converted product.category to SMALLINT",
+            "ALTER TABLE product ALTER COLUMN category TYPE SMALLINT "
+            f"USING (CASE category::text {cases} END)",
+        ),
+        (
+            "Set the SMALLINT default",
+            f"ALTER TABLE product ALTER COLUMN category SET DEFAULT {Category.UNKNOWN.value}",
+        ),
+        ("Dropped the category ENUM type", "DROP TYPE IF EXISTS category"),
+    )
+    for message, statement in steps:
+        db.session.execute(db.text(statement))
+        click.echo(message)
+    db.session.commit()
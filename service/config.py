@@ -13,7 +13,26 @@ DATABASE_URI = os.getenv(
 # Configure SQLAlchemy
 SQLALCHEMY_DATABASE_URI = DATABASE_URI
 SQLALCHEMY_TRACK_MODIFICATIONS = False
-# SQLALCHEMY_POOL_SIZE = 2
+
+# Connection pool sizing is per process: every gunicorn worker gets its own
+# pool, so the database must accept
+#   workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+# connections, e.g. 4 workers * (20 + 10) = 120 (PostgreSQL defaults to 100)
+# The pool and connect options only apply to PostgreSQL; SQLite URIs use
+# StaticPool/SingletonThreadPool, which reject them
+SQLALCHEMY_ENGINE_OPTIONS = {}
+if DATABASE_URI.startswith("postgresql"):
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        # Reuse the most recently returned connection to keep hot ones hot
+        "pool_use_lifo": True,
+        "connect_args": {
+            "options": f"-c statement_timeout={os.getenv('DB_STATEMENT_TIMEOUT', '5000')}"
+        },
+    }
 
 # Secret for session management
 SECRET_KEY = os.getenv("SECRET_KEY", "sup3r-s3cr3t")
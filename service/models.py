@@ -1,15 +1,23 @@
 ######################################################################
 # Models for Product Demo Service
 ######################################################################
+import csv
+import io
 import logging
 from enum import Enum
+from operator import attrgetter
+from typing import Annotated
 from decimal import Decimal
+import msgspec
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 
-logger = logging.getLogger("flask.app")
+# Child of app.logger, so it inherits the app log level and handlers
+logger = logging.getLogger(__name__)
 
-db = SQLAlchemy()
+# Reads never need a flush first, and committed instances keep their loaded
+# state so serialize() after create()/update() does not re-SELECT the row
+db = SQLAlchemy(session_options={"autoflush": False, "expire_on_commit": False})
 
 
 def init_db(app):
@@ -29,18 +37,56 @@ class Category(Enum):
     TOOLS = 5
 
 
+CATEGORY_BY_NAME = {category.name: category for category in Category}
+
+# Fetches every serialized attribute of a Product in a single C call
+_PRODUCT_FIELDS = attrgetter("id", "name", "description", "price", "available", "category")
+
+
+class CategoryType(db.TypeDecorator):  # pylint: disable=too-many-ancestors
+    """Stores a Category as its SMALLINT value instead of a named ENUM"""
+
+    impl = db.SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):  # pylint: disable=unused-argument
+        if value is None:
+            return None  # pragma: no cover
+        if isinstance(value, str):
+            value = CATEGORY_BY_NAME[value]
+        return value.value
+
+    def process_result_value(self, value, dialect):  # pylint: disable=unused-argument
+        if value is None:
+            return None  # pragma: no cover
+        return Category(value)
+
+
+class ProductIn(msgspec.Struct):  # pylint: disable=too-few-public-methods
+    """Schema used to validate incoming Product data"""
+
+    name: Annotated[str, msgspec.Meta(max_length=100)]
+    description: Annotated[str, msgspec.Meta(max_length=250)]
+    price: Decimal
+    available: bool
+    category: str
+
+
 class Product(db.Model):
     """Class that represents a Product"""
 
+    __table_args__ = (db.Index("ix_product_avail_cat", "available", "category"),)
+
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.String(250), nullable=False)
     price = db.Column(db.Numeric, nullable=False)
     available = db.Column(db.Boolean(), nullable=False, default=True)
     category = db.Column(
-        db.Enum(Category),
+        CategoryType(),
         nullable=False,
-        server_default=Category.UNKNOWN.name,
+        server_default=str(Category.UNKNOWN.value),
+        index=True,
     )
 
     def __repr__(self):  # pragma: no cover
@@ -64,35 +110,38 @@ class Product(db.Model):
         db.session.commit()
 
     def serialize(self):
+        product_id, name, description, price, available, category = _PRODUCT_FIELDS(self)
         return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "price": str(self.price),
-            "available": self.available,
-            "category": self.category.name,
+            "id": product_id,
+            "name": name,
+            "description": description,
+            "price": price,
+            "available": available,
+            "category": category.name,
         }
 
     def deserialize(self, data):
+        """Deserializes a Product from a dict or a raw JSON document"""
         if not data:
             raise DataValidationError("No data provided")  # pragma: no cover
 
         try:
-            self.name = data["name"]
-            self.description = data["description"]
-            self.price = Decimal(data["price"])
-
-            if not isinstance(data["available"], bool):
-                raise DataValidationError("Invalid type for available")  # pragma: no cover
-
-            self.available = data["available"]
-            self.category = Category[data["category"]]
-
-        except KeyError as error:
-            raise DataValidationError(f"Missing field: {error}") from error  # pragma: no cover
-        except Exception as error:
-            raise DataValidationError(str(error)) from error  # pragma: no cover
-
+            if isinstance(data, (bytes, str)):
+                product_in = msgspec.json.decode(data, type=ProductIn)
+            else:
+                product_in = msgspec.convert(data, ProductIn)
+        except msgspec.DecodeError as error:
+            raise DataValidationError(str(error)) from error
+
+        category = CATEGORY_BY_NAME.get(product_in.category)
+        if category is None:
+            raise DataValidationError("Invalid category")
+
+        self.name = product_in.name
+        self.description = product_in.description
+        self.price = product_in.price
+        self.available = product_in.available
+        self.category = category
         return self
 
     ##################################################
@@ -106,6 +155,62 @@ class Product(db.Model):
         app.app_context().push()
         db.create_all()
 
+    @classmethod
+    def deserialize_batch(cls, data, max_size=None):
+        """Validates a raw JSON array of at most max_size Products into rows for bulk_seed()"""
+        batch_type = Annotated[list[ProductIn], msgspec.Meta(max_length=max_size)]
+        try:
+            products_in = msgspec.json.decode(data, type=batch_type)
+        except msgspec.DecodeError as error:
+            raise DataValidationError(str(error)) from error
+        if not products_in:
+            raise DataValidationError("No data provided")
+
+        for index, product_in in enumerate(products_in):
+            if product_in.category not in CATEGORY_BY_NAME:
+                raise DataValidationError(f"Invalid category - at `$[{index}].category`")
+        return [msgspec.structs.asdict(product_in) for product_in in products_in]
+
+    @classmethod
+    def bulk_seed(cls, rows):
+        """Loads serialized Products in a single COPY ... FROM STDIN"""
+        logger.info("Seeding %d Products", len(rows))
+        columns = ("name", "description", "price", "available", "category")
+        if db.engine.dialect.name != "postgresql":
+            # COPY is PostgreSQL only, fall back to one executemany INSERT
+            db.session.execute(db.insert(cls), [{col: row[col] for col in columns} for row in rows])
+            db.session.commit()
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+        for row in rows:
+            writer.writerow(
+                [row["name"], row["description"], row["price"], row["available"],
+                 CATEGORY_BY_NAME[row["category"]].value]
+            )
+        buffer.seek(0)
+        with db.session.connection().connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {cls.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        db.session.commit()
+
+    @classmethod
+    def delete_by_id(cls, product_id):
+        """Deletes a Product with a single DELETE ... RETURNING
+
+        Returns False when there was no Product with that id
+        """
+        logger.info("Deleting id %s", product_id)
+        result = db.session.execute(
+            db.delete(cls).where(cls.id == product_id).returning(cls.id)
+        )
+        deleted = result.first() is not None
+        db.session.commit()
+        return deleted
+
     @classmethod
     def all(cls):
         logger.info("Processing all Products")
@@ -114,7 +219,7 @@ class Product(db.Model):
     @classmethod
     def find(cls, product_id):
         logger.info("Processing lookup for id %s ...", product_id)
-        return cls.query.get(product_id)
+        return db.session.get(cls, product_id)
 
     @classmethod
     def find_by_name(cls, name):
@@ -140,9 +245,31 @@ class Product(db.Model):
         if isinstance(category, Category):
             category_enum = category
         else:
-            try:
-                category_enum = Category[category]
-            except KeyError:
+            category_enum = CATEGORY_BY_NAME.get(category)
+            if category_enum is None:
                 return None
 
         return cls.query.filter(cls.category == category_enum).all()
+
+    @classmethod
+    def list_rows(cls, *filters, limit=None, offset=0, after=None):
+        """Returns plain column rows for the Products matching the filters
+
+        Rows are ordered by id. Pass ``after`` (the last id already seen)
+        to page by keyset instead of by ``offset``
+        """
+        logger.info("Processing row query with %d filters ...", len(filters))
+        stmt = db.select(
+            cls.id,
+            cls.name,
+            cls.description,
+            cls.price,
+            cls.available,
+            cls.category,
+        ).where(*filters)
+        if after is not None:
+            stmt = stmt.where(cls.id > after)
+        elif offset:
+            stmt = stmt.offset(offset)
+        stmt = stmt.order_by(cls.id).limit(limit)
+        return db.session.execute(stmt).all()
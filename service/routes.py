@@ -3,11 +3,17 @@
 ######################################################################
 import logging
 from flask import jsonify, request, abort, url_for
-from service.models import Product, DataValidationError
+from sqlalchemy.exc import DataError
+from service.models import db, Product, DataValidationError, CATEGORY_BY_NAME
 from service.common import status
 from . import app
 
-logger = logging.getLogger("flask.app")
+# Child of app.logger, so it inherits the app log level and handlers
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BULK_SIZE = 1000
 
 
 ######################################################################
@@ -30,12 +36,33 @@ def index():
 # UTIL
 ######################################################################
 def check_content_type(content_type):
-    if "Content-Type" not in request.headers:
-        abort(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
-    if request.headers["Content-Type"] != content_type:
+    if request.mimetype != content_type:
         abort(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
 
 
+def _page_args():
+    """Returns the (size, offset, last_id) paging arguments of the request"""
+    if "page" in request.args and "last_id" in request.args:
+        abort(status.HTTP_400_BAD_REQUEST, "Use either page or last_id, not both")
+    page = max(request.args.get("page", 1, type=int), 1)
+    size = request.args.get("size", DEFAULT_PAGE_SIZE, type=int)
+    size = min(max(size, 1), MAX_PAGE_SIZE)
+    last_id = request.args.get("last_id", type=int)
+    return size, (page - 1) * size, last_id
+
+
+def _row_to_dict(row):
+    """Serializes a row from Product.list_rows() without an ORM instance"""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "description": row.description,
+        "price": row.price,
+        "available": row.available,
+        "category": row.category.name,
+    }
+
+
 ######################################################################
 # CREATE
 ######################################################################
@@ -45,7 +72,7 @@ def create_products():
 
     try:
         product = Product()
-        product.deserialize(request.get_json())
+        product.deserialize(request.get_data(cache=False))
         product.create()
     except DataValidationError:
         abort(status.HTTP_400_BAD_REQUEST, "Invalid product data")
@@ -58,6 +85,24 @@ def create_products():
     )
 
 
+@app.route("/products/bulk", methods=["POST"])
+def create_products_bulk():
+    check_content_type("application/json")
+
+    try:
+        rows = Product.deserialize_batch(request.get_data(cache=False), max_size=MAX_BULK_SIZE)
+    except DataValidationError as error:
+        abort(status.HTTP_400_BAD_REQUEST, f"Invalid product data: {error}")
+
+    try:
+        Product.bulk_seed(rows)
+    except DataError as error:
+        db.session.rollback()
+        logger.warning("Bulk load rejected by the database: %s", error.orig)
+        abort(status.HTTP_400_BAD_REQUEST, "Invalid product data: rejected by the database")
+    return jsonify(created=len(rows)), status.HTTP_201_CREATED
+
+
 ######################################################################
 # LIST
 ######################################################################
@@ -67,23 +112,32 @@ def list_products():
     category = request.args.get("category")
     available = request.args.get("available")
 
-    if name:
-        products = Product.find_by_name(name)
-
-    elif category:
-        products = Product.find_by_category(category)
-        if products is None:
-            abort(status.HTTP_400_BAD_REQUEST, "Invalid category")
+    # Reject bad arguments before any query is issued
+    if category and category not in CATEGORY_BY_NAME:
+        abort(status.HTTP_400_BAD_REQUEST, "Invalid category")
+    if available is not None and available.lower() not in ("true", "false"):
+        abort(status.HTTP_400_BAD_REQUEST, "Invalid availability")
 
-    elif available is not None:
-        if available.lower() not in ["true", "false"]:
-            abort(status.HTTP_400_BAD_REQUEST, "Invalid availability")
-        products = Product.find_by_availability(available.lower() == "true")
-
-    else:
-        products = Product.all()
-
-    return jsonify([p.serialize() for p in products]), status.HTTP_200_OK
+    # All filters are combined into a single query
+    filters = []
+    if name:
+        filters.append(Product.name == name)
+    if category:
+        filters.append(Product.category == CATEGORY_BY_NAME[category])
+    if available is not None:
+        filters.append(Product.available == (available.lower() == "true"))
+
+    size, offset, last_id = _page_args()
+    # One extra row tells whether another page follows
+    rows = Product.list_rows(*filters, limit=size + 1, offset=offset, after=last_id)
+    next_id = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_id = rows[-1].id
+    return (
+        jsonify(items=list(map(_row_to_dict, rows)), next=next_id),
+        status.HTTP_200_OK,
+    )
 
 
 ######################################################################
@@ -108,7 +162,7 @@ def update_product(product_id):
         abort(status.HTTP_404_NOT_FOUND, "Product not found")
 
     try:
-        product.deserialize(request.get_json())
+        product.deserialize(request.get_data(cache=False))
         product.update()
     except DataValidationError:
         abort(status.HTTP_400_BAD_REQUEST, "Invalid product data")
@@ -122,9 +176,6 @@ def update_product(product_id):
 @app.route("/products/<int:product_id>", methods=["DELETE"])
 def delete_products(product_id):
     logger.info("Processing delete for id %s ...", product_id)
-    product = Product.find(product_id)
-    if not product:
+    if not Product.delete_by_id(product_id):
         abort(status.HTTP_404_NOT_FOUND, "Product not found")
-
-    product.delete()
     return "", status.HTTP_204_NO_CONTENT
@@ -189,7 +189,8 @@ $(function () {
 
         let name = $("#product_name").val();
         let description = $("#product_description").val();
-        let available = $("#product_available").val() == "true";
+        // An empty value means "Any", so the filter is left out
+        let available = $("#product_available").val();
         let category = $("#product_category").val();
 
         let queryString = ""
@@ -238,8 +239,8 @@ $(function () {
             table += '<th class="col-md-2">Price</th>'
             table += '</tr></thead><tbody>'
             let firstProduct = "";
-            for(let i = 0; i < res.length; i++) {
-                let product = res[i];
+            for(let i = 0; i < res.items.length; i++) {
+                let product = res.items[i];
                 table +=  `<tr id="row_${i}"><td>${product.id}</td><td>${product.name}</td><td>${product.description}</td><td>${product.available}</td><td>${product.category}</td><td>${product.price}</td></tr>`;
                 if (i == 0) {
                     firstProduct = product;
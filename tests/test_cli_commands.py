@@ -5,7 +5,9 @@ import os
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
 from click.testing import CliRunner
-from service.common.cli_commands import db_create
+from sqlalchemy import Integer, SMALLINT
+from sqlalchemy.dialects.postgresql import ENUM
+from service.common.cli_commands import db_create, db_migrate_category
 
 
 class TestFlaskCLI(TestCase):
@@ -21,3 +23,43 @@ class TestFlaskCLI(TestCase):
         with patch.dict(os.environ, {"FLASK_APP": "service:app"}, clear=True):
             result = self.runner.invoke(db_create)
             self.assertEqual(result.exit_code, 0)
+
+    @patch('service.common.cli_commands.db')
+    def test_db_migrate_category(self, db_mock):
+        """It should call the db-migrate-category command"""
+        db_mock.return_value = MagicMock()
+        db_mock.inspect.return_value.get_columns.return_value = [
+            {"name": "id", "type": Integer()},
+            {"name": "category", "type": ENUM("UNKNOWN", "CLOTHS", name="category")},
+        ]
+        with patch.dict(os.environ, {"FLASK_APP": "service:app"}, clear=True):
+            result = self.runner.invoke(db_migrate_category)
+            self.assertEqual(result.exit_code, 0)
+            db_mock.session.commit.assert_called_once()
+
+        statements = [call.args[0] for call in db_mock.text.call_args_list]
+        self.assertEqual(statements[0], "SET LOCAL statement_timeout = 0")
+        self.assertEqual(statements[1], "ALTER TABLE product ALTER COLUMN category DROP DEFAULT")
+        self.assertEqual(
+            statements[2],
+            "ALTER TABLE product ALTER COLUMN category TYPE SMALLINT USING (CASE category::text "
+            "WHEN 'UNKNOWN' THEN 0 WHEN 'CLOTHS' THEN 1 WHEN 'FOOD' THEN 2 "
+            "WHEN 'HOUSEWARES' THEN 3 WHEN 'AUTOMOTIVE' THEN 4 WHEN 'TOOLS' THEN 5 END)",
+        )
+        self.assertEqual(statements[3], "ALTER TABLE product ALTER COLUMN category SET DEFAULT 0")
+        self.assertEqual(statements[4], "DROP TYPE IF EXISTS category")
+        self.assertEqual(db_mock.session.execute.call_count, 5)
+        self.assertIn("Converted product.category to SMALLINT", result.output)
+
+    @patch('service.common.cli_commands.db')
+    def test_db_migrate_category_already_done(self, db_mock):
+        """It should leave an already migrated category column alone"""
+        db_mock.inspect.return_value.get_columns.return_value = [
+            {"name": "category", "type": SMALLINT()},
+        ]
+        with patch.dict(os.environ, {"FLASK_APP": "service:app"}, clear=True):
+            result = self.runner.invoke(db_migrate_category)
+            self.assertEqual(result.exit_code, 0)
+        self.assertIn("already SMALLINT", result.output)
+        db_mock.session.execute.assert_not_called()
+        db_mock.session.commit.assert_not_called()
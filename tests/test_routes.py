@@ -20,8 +20,11 @@ import os
 import logging
 from decimal import Decimal
 from unittest import TestCase
-from service import app
+from unittest.mock import patch
+from sqlalchemy.exc import DataError
+from service import app, routes
 from service.common import status
+from service.common.json_provider import OrjsonProvider
 from service.models import db, init_db, Product
 from tests.factories import ProductFactory
 
@@ -61,15 +64,8 @@ class TestProductRoutes(TestCase):
     # Utility function
     ############################################################
     def _create_products(self, count=1):
-        products = []
-        for _ in range(count):
-            product = ProductFactory()
-            response = self.client.post(BASE_URL, json=product.serialize())
-            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-            data = response.get_json()
-            product.id = data["id"]
-            products.append(product)
-        return products
+        Product.bulk_seed([ProductFactory().serialize() for _ in range(count)])
+        return Product.all()
 
     ############################################################
     # BASIC TESTS
@@ -81,6 +77,12 @@ class TestProductRoutes(TestCase):
     def test_health(self):
         response = self.client.get("/health")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.get_json()["message"], "OK")
+
+    def test_json_provider(self):
+        self.assertIsInstance(app.json, OrjsonProvider)
+        self.assertEqual(app.json.dumps({"price": Decimal("9.99")}), '{"price":"9.99"}')
+        self.assertEqual(app.json.loads(b'{"a":[1,2]}'), {"a": [1, 2]})
 
     ############################################################
     # CRUD TESTS
@@ -90,6 +92,49 @@ class TestProductRoutes(TestCase):
         response = self.client.post(BASE_URL, json=product.serialize())
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_create_products_bulk(self):
+        products = [ProductFactory().serialize() for _ in range(3)]
+        response = self.client.post(f"{BASE_URL}/bulk", json=products)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.get_json()["created"], 3)
+        self.assertEqual(len(Product.all()), 3)
+
+    def test_create_products_bulk_bad_request(self):
+        products = [ProductFactory().serialize() for _ in range(3)]
+        products[1]["category"] = "INVALID"
+        response = self.client.post(f"{BASE_URL}/bulk", json=products)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("$[1].category", response.get_json()["message"])
+
+        products[1] = {"name": "Ghost Product"}
+        response = self.client.post(f"{BASE_URL}/bulk", json=products)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(f"{BASE_URL}/bulk", json=[])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(Product.all()), 0)
+
+    def test_create_products_bulk_limits(self):
+        products = [ProductFactory().serialize() for _ in range(3)]
+        products[2]["name"] = "x" * 101
+        response = self.client.post(f"{BASE_URL}/bulk", json=products)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("$[2].name", response.get_json()["message"])
+
+        products[2] = ProductFactory().serialize()
+        with patch.object(routes, "MAX_BULK_SIZE", 2):
+            response = self.client.post(f"{BASE_URL}/bulk", json=products)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(Product.all()), 0)
+
+    def test_create_products_bulk_data_error(self):
+        products = [ProductFactory().serialize() for _ in range(3)]
+        error = DataError("COPY product", {}, Exception("value too long"))
+        with patch.object(Product, "bulk_seed", side_effect=error):
+            response = self.client.post(f"{BASE_URL}/bulk", json=products)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(Product.all()), 0)
+
     def test_get_product(self):
         product = self._create_products()[0]
         response = self.client.get(f"{BASE_URL}/{product.id}")
@@ -97,6 +142,7 @@ class TestProductRoutes(TestCase):
         data = response.get_json()
         self.assertEqual(data["name"], product.name)
         self.assertEqual(data["description"], product.description)
+        self.assertIsInstance(data["price"], str)
         self.assertEqual(Decimal(data["price"]), product.price)
         self.assertEqual(data["available"], product.available)
 
@@ -113,15 +159,44 @@ class TestProductRoutes(TestCase):
         product = self._create_products()[0]
         response = self.client.delete(f"{BASE_URL}/{product.id}")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(f"{BASE_URL}/{product.id}")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     ############################################################
     # LIST & FILTER TESTS
     ############################################################
     def test_list_all_products(self):
         self._create_products(3)
-        response = self.client.get(BASE_URL)
+        response = self.client.get(f"{BASE_URL}?size=10")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.get_json()), 3)
+        self.assertEqual(len(response.get_json()["items"]), 3)
+
+    def test_list_products_paginated(self):
+        products = self._create_products(5)
+        ids = sorted(product.id for product in products)
+
+        response = self.client.get(f"{BASE_URL}?size=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual([item["id"] for item in data["items"]], ids[:2])
+        self.assertEqual(data["next"], ids[1])
+
+        response = self.client.get(f"{BASE_URL}?size=2&page=2")
+        self.assertEqual([item["id"] for item in response.get_json()["items"]], ids[2:4])
+
+        response = self.client.get(f"{BASE_URL}?size=2&last_id={ids[3]}")
+        data = response.get_json()
+        self.assertEqual([item["id"] for item in data["items"]], ids[4:])
+        self.assertIsNone(data["next"])
+
+        # A full last page does not point at an empty one
+        response = self.client.get(f"{BASE_URL}?size=5")
+        data = response.get_json()
+        self.assertEqual(len(data["items"]), 5)
+        self.assertIsNone(data["next"])
+
+        response = self.client.get(f"{BASE_URL}?size=2&page=2&last_id={ids[1]}")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_list_products_by_name(self):
         ProductFactory(name="Laptop").create()
@@ -129,7 +204,7 @@ class TestProductRoutes(TestCase):
 
         response = self.client.get(f"{BASE_URL}?name=Laptop")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.get_json()), 1)
+        self.assertEqual(len(response.get_json()["items"]), 1)
 
     def test_list_products_by_category(self):
         ProductFactory(category="CLOTHS").create()
@@ -137,7 +212,7 @@ class TestProductRoutes(TestCase):
 
         response = self.client.get(f"{BASE_URL}?category=CLOTHS")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.get_json()), 1)
+        self.assertEqual(len(response.get_json()["items"]), 1)
 
     def test_list_products_by_availability(self):
         ProductFactory(available=True).create()
@@ -145,7 +220,19 @@ class TestProductRoutes(TestCase):
 
         response = self.client.get(f"{BASE_URL}?available=true")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.get_json()), 1)
+        self.assertEqual(len(response.get_json()["items"]), 1)
+
+    def test_list_products_combined_filters(self):
+        ProductFactory(name="Hammer", category="TOOLS", available=True).create()
+        ProductFactory(name="Hammer", category="TOOLS", available=False).create()
+        ProductFactory(name="Wrench", category="TOOLS", available=True).create()
+
+        response = self.client.get(f"{BASE_URL}?name=Hammer&category=TOOLS&available=true")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = response.get_json()["items"]
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]["name"], "Hammer")
+        self.assertTrue(items[0]["available"])
 
     ############################################################
     # ERROR HANDLING TESTS (COVERAGE BOOST)
@@ -169,6 +256,32 @@ class TestProductRoutes(TestCase):
         response = self.client.post(BASE_URL, json={})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_product_wrong_content_type(self):
+        product = ProductFactory().serialize()
+        response = self.client.post(BASE_URL, data=str(product), content_type="text/plain")
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        response = self.client.post(BASE_URL, data=str(product))
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_create_product_json_with_charset(self):
+        product = ProductFactory().serialize()
+        response = self.client.post(
+            BASE_URL, data=app.json.dumps(product), content_type="application/json; charset=utf-8"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_create_product_name_too_long(self):
+        product = ProductFactory().serialize()
+        product["name"] = "x" * 101
+        response = self.client.post(BASE_URL, json=product)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_product_invalid_category(self):
+        product = ProductFactory().serialize()
+        product["category"] = "INVALID"
+        response = self.client.post(BASE_URL, json=product)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_list_products_invalid_category(self):
         response = self.client.get(f"{BASE_URL}?category=INVALID")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)